@@ -1 +1,8 @@
+"""The Hysen Heating integration."""
 
+DATA_HASS_CONFIG = 'hysenheating_hass_config'
+
+async def async_setup(hass, config):
+    """Keep the Home Assistant configuration for the platforms set up by discovery."""
+    hass.data[DATA_HASS_CONFIG] = config
+    return True
@@ -4,12 +4,18 @@ Hysen HY03-1-Wifi device and derivative
 """
 
 import asyncio
-from functools import partial
 import binascii
 import socket
 import logging
+import time
+from functools import partial
 import voluptuous as vol
-from homeassistant.helpers import config_validation as cv, entity_platform, service
+from homeassistant.helpers import config_validation as cv, discovery, entity_platform, service
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
 from datetime import datetime
 
 from homeassistant.components.climate import (
@@ -38,10 +44,12 @@ from homeassistant.components.climate.const import (
 from homeassistant.const import (
     ATTR_ENTITY_ID,
     ATTR_TEMPERATURE,
+    CONF_DEVICES,
     CONF_HOST, 
     CONF_MAC, 
     CONF_NAME, 
     CONF_TIMEOUT,
+    EVENT_HOMEASSISTANT_STOP,
     PRECISION_HALVES,
     SERVICE_TURN_OFF,
     SERVICE_TURN_ON,  
@@ -86,6 +94,15 @@ from hysen import (
     HYSENHEAT_WEEKDAY_SUNDAY
 )
 
+from . import DATA_HASS_CONFIG
+from .poller import device_shard
+from .remote import RemoteHysenHeatingDevice, device_snapshot, read_device_snapshot
+from .profiler import HysenHeatingProfiler, PHASE_CONVERT, PHASE_STATE_WRITE
+from .retry import HysenHeatingRetryPolicy
+from .transport import HysenHeatingTransport, SharedSocketHysenHeatingDevice, async_resolve
+from .runtime import HysenHeatingRuntime
+from .drift import HysenHeatingDriftAuditor, drifted_fields
+
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_NAME = "Hysen Heating Thermostat"
@@ -195,7 +212,23 @@ HASS_MODE_TO_HYSEN = {
     HVAC_MODE_AUTO : HYSENHEAT_MODE_AUTO,
 }
 
+HYSENHEATING_DOMAIN = 'hysenheating'
+
 DATA_KEY = 'climate.hysen_heating'
+DATA_RUNTIME = 'climate.hysen_heating_runtime'
+DATA_PROFILER = 'climate.hysen_heating_profiler'
+DATA_TRANSPORT = 'climate.hysen_heating_transport'
+DATA_SERVICES = 'climate.hysen_heating_services'
+DATA_DRIFT = 'climate.hysen_heating_drift'
+
+SIGNAL_UPDATE = 'hysenheating_update_{}'
+
+RUNTIME_STORAGE_KEY     = 'hysenheating.runtime'
+RUNTIME_STORAGE_VERSION = 1
+RUNTIME_SAVE_DELAY      = 60
+
+STALE_RETRY_MIN_DELAY = 5
+STALE_RETRY_MAX_DELAY = 60
 
 ATTR_FWVERSION                = 'fwversion'
 ATTR_KEY_LOCK                 = 'key_lock'
@@ -230,6 +263,13 @@ ATTR_WE_PERIOD1_TIME          = 'we_period1_time'
 ATTR_WE_PERIOD1_TEMP          = 'we_period1_temp'
 ATTR_WE_PERIOD2_TIME          = 'we_period2_time'
 ATTR_WE_PERIOD2_TEMP          = 'we_period2_temp'
+ATTR_STATUS_AGE               = 'status_age'
+ATTR_MEMBERS                  = 'members'
+ATTR_DRIFT_FIELDS             = 'drift_fields'
+ATTR_DRIFT_CORRECTIONS        = 'drift_corrections'
+ATTR_ENABLED                  = 'enabled'
+ATTR_DURATION                 = 'duration'
+ATTR_SAMPLE_EVERY             = 'sample_every'
 
 SERVICE_SET_KEY_LOCK          = 'set_key_lock'
 SERVICE_SET_SENSOR            = 'set_sensor'
@@ -242,171 +282,221 @@ SERVICE_SET_FROST_PROTECTION  = 'set_frost_protection'
 SERVICE_SET_POWERON           = 'set_poweron'
 SERVICE_SET_TIME              = 'set_time'
 SERVICE_SET_SCHEDULE          = 'set_schedule'
+SERVICE_SET_PROFILING         = 'set_profiling'
+SERVICE_CAPTURE_PROFILE       = 'capture_profile'
+
+PROFILE_FILENAME = 'hysenheating_profile_{}'
+
+CONF_SYNC_CLOCK   = 'sync_clock'
+CONF_SYNC_HOUR    = 'sync_hour'
+CONF_POLLER       = 'poller'
+CONF_HEATER_POWER = 'heater_power'
+CONF_STALE_GRACE  = 'stale_grace'
+CONF_SHARED_SOCKET = 'shared_socket'
+CONF_ZONES        = 'zones'
+CONF_MEMBERS      = 'members'
+CONF_CURRENT_TEMPERATURE = 'current_temperature'
+CONF_DESIRED      = 'desired'
+
+ZONE_TEMPERATURE_MEAN = 'mean'
+ZONE_TEMPERATURE_MIN  = 'min'
+
+# Device command and value conversion of each setting which may be enforced
+DRIFT_COMMANDS = {
+    ATTR_KEY_LOCK: ('set_key_lock', HASS_KEY_LOCK_TO_HYSEN),
+    ATTR_SENSOR: ('set_sensor', HASS_SENSOR_TO_HYSEN),
+    ATTR_EXTERNAL_MAX_TEMP: ('set_external_max_temp', None),
+    ATTR_HYSTERESIS: ('set_hysteresis', None),
+    ATTR_CALIBRATION: ('set_calibration', None),
+    ATTR_MAX_TEMP: ('set_max_temp', None),
+    ATTR_MIN_TEMP: ('set_min_temp', None),
+    ATTR_FROST_PROTECTION: ('set_frost_protection', HASS_FROST_PROTECTION_TO_HYSEN),
+    ATTR_POWERON: ('set_poweron', HASS_POWERON_TO_HYSEN),
+}
 
-CONF_SYNC_CLOCK = 'sync_clock'
-CONF_SYNC_HOUR  = 'sync_hour'
+def _in_steps(step):
+    """Validate a value on the device's grid, other values never read back equal."""
+    def validate(value):
+        if round(value / step) * step != value:
+            raise vol.Invalid('expected a multiple of %s' % step)
+        return value
+    return validate
 
-PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
+# Settings which may be enforced, with the service values
+DESIRED_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_KEY_LOCK): vol.In([STATE_UNLOCKED, STATE_LOCKED]),
+        vol.Optional(ATTR_SENSOR): vol.In([STATE_SENSOR_INTERNAL, STATE_SENSOR_EXTERNAL, STATE_SENSOR_INT_EXT]),
+        vol.Optional(ATTR_EXTERNAL_MAX_TEMP): vol.All(
+            vol.Coerce(float), _in_steps(1), vol.Coerce(int), vol.Range(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)),
+        vol.Optional(ATTR_HYSTERESIS): vol.All(
+            vol.Coerce(int), vol.Range(min = DEVICE_HYSTERESIS_MIN, max = DEVICE_HYSTERESIS_MAX)),
+        vol.Optional(ATTR_CALIBRATION): vol.All(
+            vol.Coerce(float), _in_steps(0.5), vol.Range(min = DEVICE_CALIBRATION_MIN, max = DEVICE_CALIBRATION_MAX)),
+        vol.Optional(ATTR_MAX_TEMP): vol.All(
+            vol.Coerce(int), vol.Range(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)),
+        vol.Optional(ATTR_MIN_TEMP): vol.All(
+            vol.Coerce(int), vol.Range(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)),
+        vol.Optional(ATTR_FROST_PROTECTION): vol.In([STATE_ON, STATE_OFF]),
+        vol.Optional(ATTR_POWERON): vol.In([STATE_ON, STATE_OFF]),
+    }
+)
+
+DEVICE_OPTIONS = {
+    vol.Optional(CONF_NAME, default = DEFAULT_NAME): cv.string,
+    vol.Optional(CONF_TIMEOUT, default = 10): cv.positive_int, 
+    vol.Optional(CONF_SYNC_CLOCK, default = False): cv.boolean,
+    vol.Optional(CONF_SYNC_HOUR, default = 4): vol.All(vol.Coerce(int), vol.Clamp(min = 0, max = 23)),
+    # the URLs of all poller shards, in shard order
+    vol.Optional(CONF_POLLER): vol.All(cv.ensure_list, [cv.url]),
+    vol.Optional(CONF_HEATER_POWER): vol.All(vol.Coerce(float), vol.Range(min = 0)),
+    vol.Optional(CONF_STALE_GRACE, default = 0): cv.positive_int,
+    vol.Optional(CONF_SHARED_SOCKET, default = False): cv.boolean,
+    vol.Optional(CONF_DESIRED, default = {}): DESIRED_SCHEMA,
+}
+
+# Options a listed device inherits from the top level when it does not set them
+INHERITED_OPTIONS = [
+    option.schema
+    for option in DEVICE_OPTIONS
+    if option.schema not in (CONF_NAME, CONF_DESIRED)
+]
+
+DEVICE_SCHEMA = vol.Schema(
     {
-        vol.Optional(CONF_NAME, default = DEFAULT_NAME): cv.string,
         vol.Required(CONF_HOST): cv.string,
         vol.Required(CONF_MAC): cv.string,
-        vol.Optional(CONF_TIMEOUT, default = 10): cv.positive_int, 
-        vol.Optional(CONF_SYNC_CLOCK, default = False): cv.boolean,
-        vol.Optional(CONF_SYNC_HOUR, default = 4): vol.All(vol.Coerce(int), vol.Clamp(min = 0, max = 23)),
+        # no defaults for the inherited options, they come from the top level
+        **{
+            vol.Optional(option.schema) if option.schema in INHERITED_OPTIONS else option: validator
+            for option, validator in DEVICE_OPTIONS.items()
+        },
     }
 )
 
-async def async_setup_platform(hass, config, async_add_entities, discovery_info = None):
-    """Set up the Hysen heating thermostat platform."""
-    if DATA_KEY not in hass.data:
-        hass.data[DATA_KEY] = {}
-
-    host = config.get(CONF_HOST)
-    name = config.get(CONF_NAME)
-    mac_addr = binascii.unhexlify(config.get(CONF_MAC).encode().replace(b':', b''))
-    timeout = config.get(CONF_TIMEOUT)
-    sync_clock = config.get(CONF_SYNC_CLOCK)
-    sync_hour = config.get(CONF_SYNC_HOUR)
-   
-    hysen_device = HysenHeatingDevice((host, 80), mac_addr, timeout, sync_clock, sync_hour)
-    
-    device = HysenHeating(name, hysen_device, host)
-    hass.data[DATA_KEY][host] = device
+def _inherit_device_options(config):
+    """Use the top level options as defaults of the listed devices."""
+    inherited = {option: config[option] for option in INHERITED_OPTIONS if option in config}
+    return {
+        **config,
+        CONF_DEVICES: [{**inherited, **device} for device in config.get(CONF_DEVICES, [])],
+    }
 
-    async_add_entities([device], update_before_add = True)
+ZONE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_MEMBERS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_CURRENT_TEMPERATURE, default = ZONE_TEMPERATURE_MEAN): vol.In(
+            [ZONE_TEMPERATURE_MEAN, ZONE_TEMPERATURE_MIN]),
+        vol.Optional(CONF_DESIRED, default = {}): DESIRED_SCHEMA,
+    }
+)
 
-    platform = entity_platform.current_platform.get()
+PLATFORM_SCHEMA = vol.All(
+    PLATFORM_SCHEMA.extend(
+        {
+            vol.Inclusive(CONF_HOST, CONF_DEVICES): cv.string,
+            vol.Inclusive(CONF_MAC, CONF_DEVICES): cv.string,
+            vol.Optional(CONF_DEVICES): vol.All(cv.ensure_list, [DEVICE_SCHEMA]),
+            vol.Optional(CONF_ZONES): vol.All(cv.ensure_list, [ZONE_SCHEMA]),
+            **DEVICE_OPTIONS,
+        }
+    ),
+    cv.has_at_least_one_key(CONF_HOST, CONF_DEVICES, CONF_ZONES),
+    _inherit_device_options,
+)
 
-    platform.async_register_entity_service(
-        SERVICE_SET_KEY_LOCK,
+# Entity service schemas, compiled once and registered once per integration
+SERVICE_SCHEMAS = {
+    SERVICE_SET_KEY_LOCK: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_KEY_LOCK): vol.In([STATE_UNLOCKED, STATE_LOCKED]),
-        },
-        HysenHeating.async_set_key_lock.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_SENSOR,
+        }
+    ),
+    SERVICE_SET_SENSOR: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_SENSOR): vol.In([STATE_SENSOR_INTERNAL, STATE_SENSOR_EXTERNAL, STATE_SENSOR_INT_EXT]),
-        },
-        HysenHeating.async_set_sensor.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_HVAC_MODE,
+        }
+    ),
+    SERVICE_SET_HVAC_MODE: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_HVAC_MODE): vol.In([HVAC_MODE_OFF, HVAC_MODE_HEAT, HVAC_MODE_AUTO]),
-        },
-        HysenHeating.async_set_hvac_mode.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_TEMPERATURE,
+        }
+    ),
+    SERVICE_SET_TEMPERATURE: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_TEMPERATURE): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)
             ),
-        },
-        HysenHeating.async_set_temperature.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_TURN_ON,
+        }
+    ),
+    SERVICE_TURN_ON: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
-        },
-        HysenHeating.async_turn_on.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_TURN_OFF,
+        }
+    ),
+    SERVICE_TURN_OFF: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
-        },
-        HysenHeating.async_turn_off.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_EXTERNAL_MAX_TEMP,
+        }
+    ),
+    SERVICE_SET_EXTERNAL_MAX_TEMP: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_EXTERNAL_MAX_TEMP): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)
             ),
-        },
-        HysenHeating.async_set_external_max_temp.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_HYSTERESIS,
+        }
+    ),
+    SERVICE_SET_HYSTERESIS: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_HYSTERESIS): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_HYSTERESIS_MIN, max = DEVICE_HYSTERESIS_MAX)
             ),
-        },
-        HysenHeating.async_set_hysteresis.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_CALIBRATION,
+        }
+    ),
+    SERVICE_SET_CALIBRATION: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_CALIBRATION): vol.All(
                 vol.Coerce(float), vol.Clamp(min = DEVICE_CALIBRATION_MIN, max = DEVICE_CALIBRATION_MAX)
-            ),      
-        },
-        HysenHeating.async_set_calibration.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_MAX_TEMP,
+            ),
+        }
+    ),
+    SERVICE_SET_MAX_TEMP: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_MAX_TEMP): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)
             ),
-        },
-        HysenHeating.async_set_max_temp.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_MIN_TEMP,
+        }
+    ),
+    SERVICE_SET_MIN_TEMP: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_MIN_TEMP): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)
             ),
-        },
-        HysenHeating.async_set_min_temp.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_FROST_PROTECTION,
+        }
+    ),
+    SERVICE_SET_FROST_PROTECTION: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_FROST_PROTECTION): vol.In([STATE_ON, STATE_OFF]),
-        },
-        HysenHeating.async_set_frost_protection.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_POWERON,
+        }
+    ),
+    SERVICE_SET_POWERON: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Required(ATTR_POWERON): vol.In([STATE_ON, STATE_OFF]),
-        },
-        HysenHeating.async_set_poweron.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_TIME,
+        }
+    ),
+    SERVICE_SET_TIME: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Optional(ATTR_TIME_NOW): cv.boolean,
@@ -414,12 +504,9 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info
             vol.Optional(ATTR_DEVICE_WEEKDAY): vol.All(
                 vol.Coerce(int), vol.Clamp(min = DEVICE_WEEKDAY_MONDAY, max = DEVICE_WEEKDAY_SUNDAY)
             ),
-         },
-        HysenHeating.async_set_time.__name__,
-    )
-
-    platform.async_register_entity_service(
-        SERVICE_SET_SCHEDULE,
+        }
+    ),
+    SERVICE_SET_SCHEDULE: cv.make_entity_service_schema(
         {
             vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
             vol.Optional(ATTR_WEEKLY_SCHEDULE): vol.In([STATE_SCHEDULE_12345_67, STATE_SCHEDULE_123456_7, STATE_SCHEDULE_1234567]),
@@ -439,20 +526,264 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info
             vol.Optional(ATTR_WE_PERIOD1_TEMP): vol.All(vol.Coerce(float), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)),
             vol.Optional(ATTR_WE_PERIOD2_TIME): cv.time,
             vol.Optional(ATTR_WE_PERIOD2_TEMP): vol.All(vol.Coerce(float), vol.Clamp(min = DEVICE_MIN_TEMP, max = DEVICE_MAX_TEMP)),
-        },
-        HysenHeating.async_set_schedule.__name__,
+        }
+    ),
+}
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info = None):
+    """Set up the Hysen heating thermostat platform."""
+    if DATA_KEY not in hass.data:
+        hass.data[DATA_KEY] = {}
+    if DATA_PROFILER not in hass.data:
+        hass.data[DATA_PROFILER] = HysenHeatingProfiler()
+        _async_register_profiling_services(hass, hass.data[DATA_PROFILER])
+    if DATA_SERVICES not in hass.data:
+        hass.data[DATA_SERVICES] = True
+        _async_register_entity_services(entity_platform.current_platform.get())
+
+    device_configs = list(config.get(CONF_DEVICES, []))
+    if CONF_HOST in config:
+        device_configs.insert(0, config)
+
+    # zone settings apply to their members over the top level ones,
+    # a device's own settings take precedence
+    zone_desired = {}
+    for zone_config in config.get(CONF_ZONES, []):
+        for host in zone_config[CONF_MEMBERS]:
+            zone_desired.setdefault(host, {}).update(zone_config[CONF_DESIRED])
+
+    devices = [
+        await _async_create_device(
+            hass,
+            device_config,
+            {
+                **config[CONF_DESIRED],
+                **zone_desired.get(device_config[CONF_HOST], {}),
+                **device_config[CONF_DESIRED],
+            })
+        for device_config in device_configs
+    ]
+    # a device which cannot be set up does not hold back the others
+    devices = [device for device in devices if device is not None]
+    for device in devices:
+        hass.data[DATA_KEY][device.host] = device
+
+    zones = [
+        HysenHeatingZone(
+            zone_config[CONF_NAME],
+            zone_config[CONF_MEMBERS],
+            zone_config[CONF_CURRENT_TEMPERATURE])
+        for zone_config in config.get(CONF_ZONES, [])
+    ]
+
+    async_add_entities(devices + zones, update_before_add = True)
+
+    hass.async_create_task(
+        discovery.async_load_platform(
+            hass,
+            'sensor',
+            HYSENHEATING_DOMAIN,
+            {'hosts': [device.host for device in devices]},
+            hass.data[DATA_HASS_CONFIG]))
+
+async def _async_create_device(hass, config, desired):
+    """Create the entity of one thermostat, None if it cannot be set up."""
+    host = config.get(CONF_HOST)
+    name = config.get(CONF_NAME)
+    mac_addr = binascii.unhexlify(config.get(CONF_MAC).encode().replace(b':', b''))
+    timeout = config.get(CONF_TIMEOUT)
+    sync_clock = config.get(CONF_SYNC_CLOCK)
+    sync_hour = config.get(CONF_SYNC_HOUR)
+    poller = config.get(CONF_POLLER)
+    heater_power = config.get(CONF_HEATER_POWER)
+    stale_grace = config.get(CONF_STALE_GRACE)
+    shared_socket = config.get(CONF_SHARED_SOCKET)
+   
+    if poller is not None:
+        poller_url = poller[device_shard(config.get(CONF_MAC), len(poller))]
+        hysen_device = RemoteHysenHeatingDevice(poller_url, host, mac_addr, timeout)
+    elif shared_socket:
+        transport = await _async_get_transport(hass)
+        # resolved once, without blocking the event loop in sendto
+        try:
+            address = await async_resolve(host)
+        except OSError as exc:
+            _LOGGER.error("[%s] Cannot resolve host, device skipped: %s", host, exc)
+            return None
+        hysen_device = SharedSocketHysenHeatingDevice((address, 80), mac_addr, timeout, sync_clock, sync_hour, transport)
+    else:
+        hysen_device = HysenHeatingDevice((host, 80), mac_addr, timeout, sync_clock, sync_hour)
+    
+    return HysenHeating(
+        name,
+        hysen_device,
+        host,
+        hass.data[DATA_PROFILER],
+        heater_power,
+        stale_grace,
+        desired,
+        _async_get_drift_auditor(hass) if desired else None)
+
+@callback
+def _async_register_entity_services(platform):
+    """Register the entity services, shared by all platform entries."""
+    for service_name, method in (
+        (SERVICE_SET_KEY_LOCK, HysenHeating.async_set_key_lock),
+        (SERVICE_SET_SENSOR, HysenHeating.async_set_sensor),
+        (SERVICE_SET_HVAC_MODE, HysenHeating.async_set_hvac_mode),
+        (SERVICE_SET_TEMPERATURE, HysenHeating.async_set_temperature),
+        (SERVICE_TURN_ON, HysenHeating.async_turn_on),
+        (SERVICE_TURN_OFF, HysenHeating.async_turn_off),
+        (SERVICE_SET_EXTERNAL_MAX_TEMP, HysenHeating.async_set_external_max_temp),
+        (SERVICE_SET_HYSTERESIS, HysenHeating.async_set_hysteresis),
+        (SERVICE_SET_CALIBRATION, HysenHeating.async_set_calibration),
+        (SERVICE_SET_MAX_TEMP, HysenHeating.async_set_max_temp),
+        (SERVICE_SET_MIN_TEMP, HysenHeating.async_set_min_temp),
+        (SERVICE_SET_FROST_PROTECTION, HysenHeating.async_set_frost_protection),
+        (SERVICE_SET_POWERON, HysenHeating.async_set_poweron),
+        (SERVICE_SET_TIME, HysenHeating.async_set_time),
+        (SERVICE_SET_SCHEDULE, HysenHeating.async_set_schedule),
+    ):
+        platform.async_register_entity_service(service_name, SERVICE_SCHEMAS[service_name], method.__name__)
+
+@callback
+def _async_register_profiling_services(hass, profiler):
+    """Register the integration wide profiling services."""
+
+    async def async_set_profiling(call):
+        profiler.enabled = call.data[ATTR_ENABLED]
+        if profiler.enabled:
+            profiler.reset()
+        else:
+            _LOGGER.info("Hysen heating phase timings:\n%s", profiler.summary())
+
+    async def async_capture_profile(call):
+        if profiler.capturing:
+            _LOGGER.warning("A profile capture is already running")
+            return
+        was_enabled = profiler.enabled
+        profiler.enabled = True
+        profiler.reset()
+        profiler.start_capture(call.data[ATTR_DURATION], call.data[ATTR_SAMPLE_EVERY])
+
+        async def async_finish_capture(_now):
+            profiler.enabled = was_enabled
+            path = hass.config.path(PROFILE_FILENAME.format(datetime.now().strftime('%Y%m%d_%H%M%S')))
+            await hass.async_add_executor_job(profiler.dump, profiler.stop_capture(), path)
+            _LOGGER.info("Hysen heating profile written to %s.txt", path)
+
+        async_call_later(hass, call.data[ATTR_DURATION], async_finish_capture)
+
+    hass.services.async_register(
+        HYSENHEATING_DOMAIN,
+        SERVICE_SET_PROFILING,
+        async_set_profiling,
+        vol.Schema({vol.Required(ATTR_ENABLED): cv.boolean}),
+    )
+
+    hass.services.async_register(
+        HYSENHEATING_DOMAIN,
+        SERVICE_CAPTURE_PROFILE,
+        async_capture_profile,
+        vol.Schema({
+            vol.Optional(ATTR_DURATION, default = 60): vol.All(vol.Coerce(int), vol.Range(min = 1, max = 3600)),
+            vol.Optional(ATTR_SAMPLE_EVERY, default = 1): vol.All(vol.Coerce(int), vol.Range(min = 1)),
+        }),
     )
 
+async def _async_open_transport(hass):
+    """Open the shared UDP socket, closed when Home Assistant stops."""
+    transport = await HysenHeatingTransport.async_open()
+
+    @callback
+    def async_close(event):
+        transport.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_close)
+    return transport
+
+async def _async_get_transport(hass):
+    """Return the shared UDP transport, opened once."""
+    if DATA_TRANSPORT not in hass.data:
+        hass.data[DATA_TRANSPORT] = hass.async_create_task(_async_open_transport(hass))
+    return await hass.data[DATA_TRANSPORT]
+
+@callback
+def _async_get_drift_auditor(hass):
+    """Return the drift auditor shared by the fleet, stopped with Home Assistant."""
+    if DATA_DRIFT not in hass.data:
+        auditor = hass.data[DATA_DRIFT] = HysenHeatingDriftAuditor()
+
+        @callback
+        def async_close(event):
+            auditor.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_close)
+    return hass.data[DATA_DRIFT]
+
+async def _async_load_runtime_counters(store):
+    """Load the persisted runtime counters of all devices."""
+    return await store.async_load() or {}
+
+async def _async_get_runtime_store(hass):
+    """Return the runtime counters store and its data, loaded once."""
+    if DATA_RUNTIME not in hass.data:
+        store = Store(hass, RUNTIME_STORAGE_VERSION, RUNTIME_STORAGE_KEY)
+        hass.data[DATA_RUNTIME] = (store, hass.async_create_task(_async_load_runtime_counters(store)))
+    store, load = hass.data[DATA_RUNTIME]
+    return store, await load
+
 class HysenHeating(ClimateEntity):
     """Representation of a Hysen Heating device."""
 
-    def __init__(self, name, hysen_device, host):
+    def __init__(
+                 self,
+                 name,
+                 hysen_device,
+                 host,
+                 profiler,
+                 heater_power = None,
+                 stale_grace = 0,
+                 desired = None,
+                 drift_auditor = None
+                 ):
         """Initialize the Hysen Heating device."""
         self._name = name
         self._hysen_device = hysen_device
         self._host = host
+        self._profiler = profiler
+        self._retry_policy = HysenHeatingRetryPolicy(hysen_device.timeout)
+        self._shared_socket = isinstance(hysen_device, SharedSocketHysenHeatingDevice)
+        self._runtime = HysenHeatingRuntime(heater_power)
+        self._runtime_store = None
+        self._runtime_counters = None
+        self._stale_grace = stale_grace
+        self._last_status = None
+        self._retry_delay = STALE_RETRY_MIN_DELAY
+        self._retry_unsub = None
+        self._grace_unsub = None
+        self._desired = desired or {}
+        self._drift_auditor = drift_auditor
+        self._drift_fields = []
+        self._drift_corrections = 0
 
         self._available = False
+        self._update_state(device_snapshot(hysen_device))
+
+    async def async_added_to_hass(self):
+        """Restore the persisted runtime counters."""
+        self._runtime_store, self._runtime_counters = await _async_get_runtime_store(self.hass)
+        if self._host in self._runtime_counters:
+            self._runtime.restore(self._runtime_counters[self._host])
+
+    async def async_will_remove_from_hass(self):
+        """Cancel a pending background refresh."""
+        if self._retry_unsub is not None:
+            self._retry_unsub()
+            self._retry_unsub = None
+        if self._grace_unsub is not None:
+            self._grace_unsub()
+            self._grace_unsub = None
 
     @property
     def unique_id(self):
@@ -464,6 +795,16 @@ class HysenHeating(ClimateEntity):
         """Returns the name of the device."""
         return self._name
 
+    @property
+    def host(self):
+        """Returns the host of the device."""
+        return self._host
+
+    @property
+    def runtime(self):
+        """Returns the heating runtime accumulator."""
+        return self._runtime
+
     @property
     def state(self):
         """Return current state."""
@@ -564,8 +905,18 @@ class HysenHeating(ClimateEntity):
 
     @property
     def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._available
+        """Return True if entity is available.
+           The last good status is served for stale_grace seconds after a failed poll."""
+        if self._available:
+            return True
+        return self._last_status is not None and self.status_age <= self._stale_grace
+
+    @property
+    def status_age(self):
+        """Returns the seconds since the last good device status."""
+        if self._last_status is None:
+            return None
+        return time.monotonic() - self._last_status
 
     @property
     def min_temp(self):
@@ -616,6 +967,9 @@ class HysenHeating(ClimateEntity):
             ATTR_WE_PERIOD1_TEMP: self._we_period1_temp,
             ATTR_WE_PERIOD2_TIME: self._we_period2_time,
             ATTR_WE_PERIOD2_TEMP: self._we_period2_temp,
+            ATTR_STATUS_AGE: None if self._last_status is None else round(self.status_age, 1),
+            ATTR_DRIFT_FIELDS: self._drift_fields,
+            ATTR_DRIFT_CORRECTIONS: self._drift_corrections,
         }
 
     @property
@@ -623,6 +977,11 @@ class HysenHeating(ClimateEntity):
         """Return true if device is on."""
         return self._power_state == STATE_ON
 
+    @property
+    def operation_mode(self):
+        """Return the operation mode, whether the device is on or off."""
+        return self._hvac_mode
+
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
         temp = float(kwargs.get(ATTR_TEMPERATURE))
@@ -828,62 +1187,439 @@ class HysenHeating(ClimateEntity):
             None if we_period2_time is None else we_period2_time.minute, 
             we_period2_temp)
 
-    async def _async_try_command(self, mask_error, func, *args, **kwargs):
-        """Calls a device command and handle error messages."""
-        self._available = True
+    async def _async_try_command(self, mask_error, func, *args):
+        """Calls a device command and handle error messages.
+           Returns the command result, None if the command failed."""
         try:
-            await self.hass.async_add_executor_job(partial(func, *args, **kwargs))
+            return await self._async_call(func, *args)
         except Exception as exc:
             _LOGGER.error("[%s] %s %s: %s", self._host, self._name, mask_error, exc)
-            self._available = False
+            return None
+
+    async def _async_call(self, func, *args):
+        """Calls a device command, raising its errors."""
+        if self._shared_socket:
+            return await self._hysen_device.async_call(
+                self._retry_policy,
+                func,
+                *args,
+                record = partial(self._profiler.record, self._host) if self._profiler.enabled else None)
+        return await self._retry_policy.async_call(
+            self._async_add_executor_job,
+            self._hysen_device,
+            func,
+            *args)
+
+    def _async_add_executor_job(self, target, *args):
+        """Run a device call in the executor, timed when profiling."""
+        if self._profiler.enabled:
+            return self._profiler.async_add_executor_job(self.hass, self._host, self._hysen_device, target, *args)
+        return self.hass.async_add_executor_job(target, *args)
+
+    @callback
+    def _async_write_ha_state(self):
+        """Write the state, timed when profiling."""
+        if self._profiler.enabled:
+            self._profiler.call(self._host, PHASE_STATE_WRITE, super()._async_write_ha_state)
+        else:
+            super()._async_write_ha_state()
 
     async def async_update(self):
         """Get the latest state from the device."""
-        await self._async_try_command(
+        status = await self._async_try_command(
             "Error in get_device_status",
-            self._hysen_device.get_device_status)
-        self._unique_id = self._hysen_device.unique_id
-        self._fwversion = self._hysen_device.fwversion
-        self._key_lock = str(HYSEN_KEY_LOCK_TO_HASS[self._hysen_device.key_lock])
-        self._manual_in_auto = str(HYSEN_MANUAL_IN_AUTO_TO_HASS[self._hysen_device.manual_in_auto])
-        self._valve_state = str(HYSEN_VALVE_STATE_TO_HASS[self._hysen_device.valve_state])
-        self._power_state = str(HYSEN_POWER_STATE_TO_HASS[self._hysen_device.power_state])
-        self._room_temp = float(self._hysen_device.room_temp)
-        self._target_temp = float(self._hysen_device.target_temp)
-        if self._hysen_device.operation_mode > 1:
+            read_device_snapshot,
+            self._hysen_device)
+        if status is None:
+            self._async_status_failed()
+            return
+
+        self._available = True
+        # a poller serves its cached status, already snapshot_age seconds old
+        self._last_status = time.monotonic() - (getattr(self._hysen_device, 'snapshot_age', None) or 0)
+        self._retry_delay = STALE_RETRY_MIN_DELAY
+        if self._retry_unsub is not None:
+            self._retry_unsub()
+            self._retry_unsub = None
+        if self._grace_unsub is not None:
+            self._grace_unsub()
+            self._grace_unsub = None
+
+        if self._profiler.enabled:
+            self._profiler.call(self._host, PHASE_CONVERT, self._update_state, status)
+        else:
+            self._update_state(status)
+        self._async_update_runtime()
+        self._async_audit_drift()
+
+    def _async_status_failed(self):
+        """Keep the last good status while within the grace period
+           and refresh it in the background."""
+        self._available = False
+        self._async_signal_update()
+        if not self.available:
+            return
+        if self._grace_unsub is None:
+            self._grace_unsub = async_call_later(
+                self.hass,
+                self._stale_grace - self.status_age,
+                self._async_grace_expired)
+        if self._retry_unsub is not None:
+            return
+        self._retry_unsub = async_call_later(self.hass, self._retry_delay, self._async_retry_update)
+        self._retry_delay = min(self._retry_delay * 2, STALE_RETRY_MAX_DELAY)
+
+    @callback
+    def _async_grace_expired(self, _now):
+        """Show the device unavailable as soon as its last good status is too old."""
+        self._grace_unsub = None
+        self.async_write_ha_state()
+        self._async_signal_update()
+
+    @callback
+    def _async_retry_update(self, _now):
+        """Background refresh of a stale status."""
+        self._retry_unsub = None
+        self.async_schedule_update_ha_state(True)
+
+    def _update_state(self, status):
+        """Convert a device status snapshot to Home Assistant values."""
+        self._unique_id = status['unique_id']
+        self._fwversion = status['fwversion']
+        self._key_lock = str(HYSEN_KEY_LOCK_TO_HASS[status['key_lock']])
+        self._manual_in_auto = str(HYSEN_MANUAL_IN_AUTO_TO_HASS[status['manual_in_auto']])
+        self._valve_state = str(HYSEN_VALVE_STATE_TO_HASS[status['valve_state']])
+        self._power_state = str(HYSEN_POWER_STATE_TO_HASS[status['power_state']])
+        self._room_temp = float(status['room_temp'])
+        self._target_temp = float(status['target_temp'])
+        if status['operation_mode'] > 1:
             _LOGGER.error("[%s] hvac mode \'%s\'.", 
                     self._host,
-                    self._hysen_device.operation_mode)
-        self._hvac_mode = str(HYSEN_MODE_TO_HASS[self._hysen_device.operation_mode])
-        self._schedule = str(HYSEN_SCHEDULE_TO_HASS[self._hysen_device.schedule])
-        self._sensor = str(HYSEN_SENSOR_TO_HASS[self._hysen_device.sensor])
-        self._external_max_temp = float(self._hysen_device.external_max_temp)
-        self._hysteresis = int(self._hysen_device.hysteresis)
-        self._max_temp = int(self._hysen_device.max_temp)
-        self._min_temp = int(self._hysen_device.min_temp)
-        self._calibration = float(self._hysen_device.calibration)
-        self._frost_protection = str(HYSEN_FROST_PROTECTION_TO_HASS[self._hysen_device.frost_protection])
-        self._poweron = str(HYSEN_POWERON_TO_HASS[self._hysen_device.poweron])
-        self._unknown1 = self._hysen_device.unknown1
-        self._external_temp = float(self._hysen_device.external_temp)
-        self._device_time = str(self._hysen_device.clock_hour).zfill(2) + ":" + str(self._hysen_device.clock_minute).zfill(2) + ":" + str(self._hysen_device.clock_second).zfill(2)
-        self._device_weekday = int(self._hysen_device.clock_weekday)
-        self._period1_time = str(self._hysen_device.period1_hour).zfill(2) + ":" + str(self._hysen_device.period1_min).zfill(2)
-        self._period2_time = str(self._hysen_device.period2_hour).zfill(2) + ":" + str(self._hysen_device.period2_min).zfill(2)
-        self._period3_time = str(self._hysen_device.period3_hour).zfill(2) + ":" + str(self._hysen_device.period3_min).zfill(2)
-        self._period4_time = str(self._hysen_device.period4_hour).zfill(2) + ":" + str(self._hysen_device.period4_min).zfill(2)
-        self._period5_time = str(self._hysen_device.period5_hour).zfill(2) + ":" + str(self._hysen_device.period5_min).zfill(2)
-        self._period6_time = str(self._hysen_device.period6_hour).zfill(2) + ":" + str(self._hysen_device.period6_min).zfill(2)
-        self._we_period1_time = str(self._hysen_device.we_period1_hour).zfill(2) + ":" + str(self._hysen_device.we_period1_min).zfill(2)
-        self._we_period2_time = str(self._hysen_device.we_period2_hour).zfill(2) + ":" + str(self._hysen_device.we_period2_min).zfill(2)
-        self._period1_temp = float(self._hysen_device.period1_temp)
-        self._period2_temp = float(self._hysen_device.period2_temp)
-        self._period3_temp = float(self._hysen_device.period3_temp)
-        self._period4_temp = float(self._hysen_device.period4_temp)
-        self._period5_temp = float(self._hysen_device.period5_temp)
-        self._period6_temp = float(self._hysen_device.period6_temp)
-        self._we_period1_temp = float(self._hysen_device.we_period1_temp)
-        self._we_period2_temp = float(self._hysen_device.we_period2_temp)
-        self._unknown2 = self._hysen_device.unknown2
-        self._unknown3 = self._hysen_device.unknown3
-     
+                    status['operation_mode'])
+        self._hvac_mode = str(HYSEN_MODE_TO_HASS[status['operation_mode']])
+        self._schedule = str(HYSEN_SCHEDULE_TO_HASS[status['schedule']])
+        self._sensor = str(HYSEN_SENSOR_TO_HASS[status['sensor']])
+        self._external_max_temp = float(status['external_max_temp'])
+        self._hysteresis = int(status['hysteresis'])
+        self._max_temp = int(status['max_temp'])
+        self._min_temp = int(status['min_temp'])
+        self._calibration = float(status['calibration'])
+        self._frost_protection = str(HYSEN_FROST_PROTECTION_TO_HASS[status['frost_protection']])
+        self._poweron = str(HYSEN_POWERON_TO_HASS[status['poweron']])
+        self._unknown1 = status['unknown1']
+        self._external_temp = float(status['external_temp'])
+        self._device_time = str(status['clock_hour']).zfill(2) + ":" + str(status['clock_minute']).zfill(2) + ":" + str(status['clock_second']).zfill(2)
+        self._device_weekday = int(status['clock_weekday'])
+        self._period1_time = str(status['period1_hour']).zfill(2) + ":" + str(status['period1_min']).zfill(2)
+        self._period2_time = str(status['period2_hour']).zfill(2) + ":" + str(status['period2_min']).zfill(2)
+        self._period3_time = str(status['period3_hour']).zfill(2) + ":" + str(status['period3_min']).zfill(2)
+        self._period4_time = str(status['period4_hour']).zfill(2) + ":" + str(status['period4_min']).zfill(2)
+        self._period5_time = str(status['period5_hour']).zfill(2) + ":" + str(status['period5_min']).zfill(2)
+        self._period6_time = str(status['period6_hour']).zfill(2) + ":" + str(status['period6_min']).zfill(2)
+        self._we_period1_time = str(status['we_period1_hour']).zfill(2) + ":" + str(status['we_period1_min']).zfill(2)
+        self._we_period2_time = str(status['we_period2_hour']).zfill(2) + ":" + str(status['we_period2_min']).zfill(2)
+        self._period1_temp = float(status['period1_temp'])
+        self._period2_temp = float(status['period2_temp'])
+        self._period3_temp = float(status['period3_temp'])
+        self._period4_temp = float(status['period4_temp'])
+        self._period5_temp = float(status['period5_temp'])
+        self._period6_temp = float(status['period6_temp'])
+        self._we_period1_temp = float(status['we_period1_temp'])
+        self._we_period2_temp = float(status['we_period2_temp'])
+        self._unknown2 = status['unknown2']
+        self._unknown3 = status['unknown3']
+
+    def _async_update_runtime(self):
+        """Advance the runtime counters and notify the runtime sensors."""
+        if self._runtime.update(self._valve_state == STATE_OPEN, time.monotonic()) and \
+           self._runtime_store is not None:
+            self._runtime_counters[self._host] = self._runtime.as_dict()
+            self._runtime_store.async_delay_save(lambda: self._runtime_counters, RUNTIME_SAVE_DELAY)
+        self._async_signal_update()
+
+    @callback
+    def _async_signal_update(self):
+        """Notify the runtime sensors and zones of an update, successful or not."""
+        async_dispatcher_send(self.hass, SIGNAL_UPDATE.format(self._host))
+
+    def _async_audit_drift(self):
+        """Compare the polled settings with the desired ones
+           and queue the corrective writes."""
+        if not self._desired:
+            return
+        fields = drifted_fields(self._desired, self._current_settings())
+        if fields != self._drift_fields:
+            for field in fields:
+                _LOGGER.warning("[%s] Setting %s drifted to \'%s\', expected \'%s\'.", 
+                    self._host,
+                    field,
+                    getattr(self, '_' + field),
+                    self._desired[field])
+        self._drift_fields = fields
+        for field in fields:
+            self._drift_auditor.submit(
+                self._host,
+                field,
+                partial(self._drift_needed, field),
+                partial(self._async_correct_drift, field))
+
+    def _current_settings(self):
+        """Return the last polled values of the desired settings."""
+        return {field: getattr(self, '_' + field) for field in self._desired}
+
+    def _drift_needed(self, field):
+        """Return True if a setting still needs to be corrected."""
+        return self.available and field in drifted_fields(self._desired, self._current_settings())
+
+    async def _async_correct_drift(self, field):
+        """Write the desired value of one setting.
+           Errors are raised, so only successful writes are counted."""
+        _LOGGER.info("[%s] Correcting %s to \'%s\'.", self._host, field, self._desired[field])
+        command, to_hysen = DRIFT_COMMANDS[field]
+        value = self._desired[field]
+        await self._async_call(
+            getattr(self._hysen_device, command),
+            value if to_hysen is None else to_hysen[value])
+        self._drift_corrections += 1
+
+class HysenHeatingZone(ClimateEntity):
+    """Representation of a group of Hysen Heating devices driven as one.
+       State is aggregated from the members' cached state without polling,
+       commands fan out concurrently to the members not already in the requested state."""
+
+    def __init__(self, name, member_hosts, current_temperature):
+        """Initialize the zone."""
+        self._name = name
+        self._member_hosts = member_hosts
+        self._current_temperature_mode = current_temperature
+
+    async def async_added_to_hass(self):
+        """Follow the members' polls."""
+        for host in self._member_hosts:
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass,
+                    SIGNAL_UPDATE.format(host),
+                    self.async_write_ha_state))
+
+    @property
+    def members(self):
+        """Returns the member thermostats set up so far."""
+        devices = self.hass.data[DATA_KEY]
+        return [devices[host] for host in self._member_hosts if host in devices]
+
+    @property
+    def _available_members(self):
+        return [member for member in self.members if member.available]
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return HYSENHEATING_DOMAIN + '_zone_' + slugify(self._name)
+
+    @property
+    def name(self):
+        """Returns the name of the zone."""
+        return self._name
+
+    @property
+    def should_poll(self):
+        """The members push their updates."""
+        return False
+
+    @property
+    def available(self) -> bool:
+        """Return True if any member is available."""
+        return len(self._available_members) > 0
+
+    @property
+    def precision(self):
+        """Return the precision of the system."""
+        return PRECISION_HALVES
+
+    @property
+    def temperature_unit(self):
+        """Returns the unit of measurement which this thermostat uses."""
+        return TEMP_CELSIUS
+
+    @property
+    def hvac_mode(self):
+        """Return the most common operation mode of the members."""
+        modes = [member.hvac_mode for member in self._available_members]
+        if not modes:
+            return HVAC_MODE_OFF
+        return max(set(modes), key = modes.count)
+
+    @property
+    def hvac_modes(self):
+        """Returns the list of available operation modes."""
+        return [HVAC_MODE_OFF, HVAC_MODE_HEAT, HVAC_MODE_AUTO]
+
+    @property
+    def hvac_action(self):
+        """Return heating if any member valve is open."""
+        actions = [member.hvac_action for member in self._available_members]
+        if CURRENT_HVAC_HEAT in actions:
+            return CURRENT_HVAC_HEAT
+        if CURRENT_HVAC_IDLE in actions:
+            return CURRENT_HVAC_IDLE
+        return CURRENT_HVAC_OFF
+
+    @property
+    def current_temperature(self):
+        """Returns the mean or minimum temperature of the members."""
+        temps = [member.current_temperature for member in self._available_members]
+        if not temps:
+            return None
+        if self._current_temperature_mode == ZONE_TEMPERATURE_MIN:
+            return min(temps)
+        return round(sum(temps) / len(temps), 1)
+
+    @property
+    def target_temperature(self):
+        """Returns the mean target temperature of the members which are on."""
+        temps = [member.target_temperature for member in self._available_members if member.is_on]
+        if not temps:
+            return None
+        return round(sum(temps) / len(temps) * 2) / 2
+
+    @property
+    def target_temperature_step(self):
+        """Returns the supported step of target temperature."""
+        return PRECISION_HALVES
+
+    @property
+    def supported_features(self):
+        """Returns the list of supported features."""
+        return SUPPORT_TARGET_TEMPERATURE
+
+    @property
+    def min_temp(self):
+        """Returns the minimum temperature supported by all members."""
+        return max([member.min_temp for member in self._available_members], default = DEVICE_MIN_TEMP)
+
+    @property
+    def max_temp(self):
+        """Returns the maximum temperature supported by all members."""
+        return min([member.max_temp for member in self._available_members], default = DEVICE_MAX_TEMP)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the specific state attributes of the zone."""
+        return {
+            ATTR_MEMBERS: [member.entity_id for member in self.members],
+        }
+
+    async def _async_fan_out(self, members, method, *args, **kwargs):
+        """Call a command on the members concurrently, then refresh them."""
+        if not members:
+            return
+        await asyncio.gather(*[getattr(member, method)(*args, **kwargs) for member in members])
+        for member in members:
+            member.async_schedule_update_ha_state(True)
+
+    async def _async_set_attribute(self, method, attribute, value):
+        """Fan out a setting to the members where it differs."""
+        await self._async_fan_out(
+            [member for member in self.members if member.extra_state_attributes[attribute] != value],
+            method,
+            value)
+
+    async def async_set_temperature(self, **kwargs):
+        """Set new target temperature."""
+        if kwargs.get(ATTR_TEMPERATURE) is None:
+            return
+        temp = float(kwargs.get(ATTR_TEMPERATURE))
+        await self._async_fan_out(
+            [member for member in self.members if not member.is_on or member.target_temperature != temp],
+            HysenHeating.async_set_temperature.__name__,
+            **kwargs)
+
+    async def async_set_hvac_mode(self, hvac_mode):
+        """Set hvac mode."""
+        if hvac_mode == HVAC_MODE_OFF:
+            await self.async_turn_off()
+            return
+        if hvac_mode not in [HVAC_MODE_HEAT, HVAC_MODE_AUTO]:
+            _LOGGER.error("[%s] Error in async_set_hvac_mode. Unknown hvac mode \'%s\'.", 
+                self._name,
+                hvac_mode)
+            return
+        await self.async_turn_on()
+        await self._async_fan_out(
+            [member for member in self.members if member.operation_mode != hvac_mode],
+            HysenHeating.async_set_hvac_mode.__name__,
+            hvac_mode)
+
+    async def async_turn_on(self):
+        """Turn members on."""
+        await self._async_fan_out(
+            [member for member in self.members if not member.is_on],
+            HysenHeating.async_turn_on.__name__)
+
+    async def async_turn_off(self):
+        """Turn members off."""
+        await self._async_fan_out(
+            [member for member in self.members if member.is_on],
+            HysenHeating.async_turn_off.__name__)
+
+    async def async_set_key_lock(self, key_lock):
+        """Set key lock Unlocked/Locked"""
+        await self._async_set_attribute(HysenHeating.async_set_key_lock.__name__, ATTR_KEY_LOCK, key_lock)
+
+    async def async_set_sensor(self, sensor):
+        """Set sensor type"""
+        await self._async_set_attribute(HysenHeating.async_set_sensor.__name__, ATTR_SENSOR, sensor)
+
+    async def async_set_external_max_temp(self, external_max_temp):
+        """Set external limit temperature."""
+        await self._async_set_attribute(
+            HysenHeating.async_set_external_max_temp.__name__, ATTR_EXTERNAL_MAX_TEMP, external_max_temp)
+
+    async def async_set_hysteresis(self, hysteresis):
+        """Set hysteresis"""
+        await self._async_set_attribute(HysenHeating.async_set_hysteresis.__name__, ATTR_HYSTERESIS, hysteresis)
+
+    async def async_set_calibration(self, calibration):
+        """Set temperature calibration."""
+        await self._async_set_attribute(HysenHeating.async_set_calibration.__name__, ATTR_CALIBRATION, calibration)
+
+    async def async_set_max_temp(self, max_temp):
+        """Set temperature upper limit."""
+        await self._async_set_attribute(HysenHeating.async_set_max_temp.__name__, ATTR_MAX_TEMP, max_temp)
+
+    async def async_set_min_temp(self, min_temp):
+        """Set temperature lower limit."""
+        await self._async_set_attribute(HysenHeating.async_set_min_temp.__name__, ATTR_MIN_TEMP, min_temp)
+
+    async def async_set_frost_protection(self, frost_protection):
+        """Set frost_protection"""
+        await self._async_set_attribute(
+            HysenHeating.async_set_frost_protection.__name__, ATTR_FROST_PROTECTION, frost_protection)
+
+    async def async_set_poweron(self, poweron):
+        """Set poweron"""
+        await self._async_set_attribute(HysenHeating.async_set_poweron.__name__, ATTR_POWERON, poweron)
+
+    async def async_set_time(self, **kwargs):
+        """Set device time or to system time."""
+        await self._async_fan_out(self.members, HysenHeating.async_set_time.__name__, **kwargs)
+
+    async def async_set_schedule(self, **kwargs):
+        """Set schedule on the members whose schedule differs."""
+        wanted = {}
+        for attribute, value in kwargs.items():
+            if value is None:
+                continue
+            if attribute.endswith('_time'):
+                value = value.strftime('%H:%M')
+            wanted[attribute] = value
+
+        def differs(member):
+            attributes = member.extra_state_attributes
+            return any(attributes[attribute] != value for attribute, value in wanted.items())
+
+        await self._async_fan_out(
+            [member for member in self.members if differs(member)],
+            HysenHeating.async_set_schedule.__name__,
+            **kwargs)
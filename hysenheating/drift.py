@@ -0,0 +1,77 @@
+"""
+Configuration drift auditor for Hysen Heating Thermostat Controllers.
+Settings changed on the device keypad are detected from the polled status
+and corrected by single setting writes, rate limited across the fleet.
+"""
+
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Corrective writes per second for the whole fleet, and the allowed burst
+DRIFT_RATE  = 0.2
+DRIFT_BURST = 5
+
+def drifted_fields(desired, actual):
+    """Return the desired settings which differ from the actual ones."""
+    return [field for field, value in desired.items() if actual[field] != value]
+
+class HysenHeatingDriftAuditor:
+    """One worker correcting drifted settings through a token bucket.
+       A setting is queued once per device however often it is reported."""
+
+    def __init__(self, rate = DRIFT_RATE, burst = DRIFT_BURST):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._refilled = time.monotonic()
+        self._queue = asyncio.Queue()
+        self._pending = {}
+        self._worker = None
+
+    def submit(self, host, field, needed, write):
+        """Queue the correction of a setting.
+           needed() tells whether it still differs when its turn comes,
+           write() is the coroutine function doing the corrective write, raising on failure."""
+        key = (host, field)
+        if key not in self._pending:
+            self._queue.put_nowait(key)
+        self._pending[key] = (needed, write)
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._async_run())
+
+    def close(self):
+        """Stop the worker, dropping the queued corrections."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _async_acquire(self):
+        """Wait for a write token."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._refilled) * self._rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    async def _async_run(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._async_acquire()
+                # the latest submission wins, it stays pending until written
+                needed, write = self._pending[key]
+                if not needed():
+                    # corrected meanwhile, give the token back
+                    self._tokens = min(self._burst, self._tokens + 1)
+                    continue
+                await write()
+            except Exception as exc:
+                _LOGGER.error("[%s] Error correcting %s: %s", key[0], key[1], exc)
+            finally:
+                self._pending.pop(key, None)
@@ -0,0 +1,190 @@
+"""
+Standalone fleet poller for Hysen Heating Thermostat Controllers.
+Polls a shard of the device list and serves cached status snapshots
+and device commands over a local HTTP API.
+
+Usage:
+    python -m hysenheating.poller devices.yaml --port 8765 --shard 0 --shards 2
+
+API:
+    GET  /devices                   cached snapshots of all polled devices
+    GET  /devices/<host>            cached snapshot of one device
+    POST /devices/<host>/<command>  run a device command, body {"args": [...]}
+"""
+
+import argparse
+import asyncio
+import binascii
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import yaml
+from aiohttp import web
+
+from hysen import HysenHeatingDevice
+
+from .remote import HYSENHEAT_COMMANDS, device_snapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT          = 8765
+DEFAULT_SCAN_INTERVAL = 30
+DEFAULT_TIMEOUT       = 10
+DEFAULT_SYNC_HOUR     = 4
+DEFAULT_WORKERS       = 16
+
+def mac_to_bytes(mac):
+    """Convert a 'xx:xx:xx:xx:xx:xx' MAC address to bytes."""
+    return binascii.unhexlify(mac.encode().replace(b':', b''))
+
+def device_shard(mac, shards):
+    """Return the shard a device belongs to, stable across processes."""
+    return int.from_bytes(mac_to_bytes(mac), 'big') % shards
+
+class PolledDevice:
+    """A device owned by the poller together with its cached snapshot."""
+
+    def __init__(self, conf, default_timeout):
+        self.host = conf['host']
+        self.device = HysenHeatingDevice(
+            (self.host, 80),
+            mac_to_bytes(conf['mac']),
+            conf.get('timeout', default_timeout),
+            conf.get('sync_clock', False),
+            conf.get('sync_hour', DEFAULT_SYNC_HOUR))
+        # HysenHeatingDevice is not thread safe, polls and commands are serialized
+        self.lock = asyncio.Lock()
+        self.snapshot = None
+        self.updated = None
+
+    def response(self):
+        return {
+            'status': self.snapshot,
+            'age': round(time.monotonic() - self.updated, 3),
+        }
+
+class HysenHeatingPoller:
+    """Polls a set of devices and serves their cached state."""
+
+    def __init__(self, devices, scan_interval, stale_after, executor):
+        self._devices = {device.host: device for device in devices}
+        self._scan_interval = scan_interval
+        self._stale_after = stale_after
+        self._executor = executor
+
+    async def _async_run(self, polled, func, *args):
+        """Run a device call in the executor and refresh the snapshot."""
+        loop = asyncio.get_running_loop()
+        async with polled.lock:
+            await loop.run_in_executor(self._executor, partial(func, *args))
+            if func != polled.device.get_device_status:
+                await loop.run_in_executor(self._executor, polled.device.get_device_status)
+            polled.snapshot = device_snapshot(polled.device)
+            polled.updated = time.monotonic()
+
+    async def _async_poll(self, polled, delay):
+        """Poll one device forever."""
+        await asyncio.sleep(delay)
+        while True:
+            try:
+                await self._async_run(polled, polled.device.get_device_status)
+            except Exception as exc:
+                _LOGGER.error("[%s] Error in get_device_status: %s", polled.host, exc)
+            await asyncio.sleep(self._scan_interval)
+
+    def _get_device(self, request):
+        polled = self._devices.get(request.match_info['host'])
+        if polled is None:
+            raise web.HTTPNotFound(text = 'Unknown device')
+        return polled
+
+    async def _handle_devices(self, request):
+        return web.json_response({
+            host: polled.response()
+            for host, polled in self._devices.items()
+            if polled.snapshot is not None
+        })
+
+    async def _handle_device(self, request):
+        polled = self._get_device(request)
+        if polled.snapshot is None:
+            raise web.HTTPServiceUnavailable(text = 'No status received yet')
+        if time.monotonic() - polled.updated > self._stale_after:
+            raise web.HTTPServiceUnavailable(text = 'Status is stale')
+        return web.json_response(polled.response())
+
+    async def _handle_command(self, request):
+        polled = self._get_device(request)
+        command = request.match_info['command']
+        if command not in HYSENHEAT_COMMANDS:
+            raise web.HTTPNotFound(text = 'Unknown command')
+        args = (await request.json()).get('args', [])
+        try:
+            await self._async_run(polled, getattr(polled.device, command), *args)
+        except Exception as exc:
+            _LOGGER.error("[%s] Error in %s: %s", polled.host, command, exc)
+            raise web.HTTPBadGateway(text = str(exc))
+        return web.json_response(polled.response())
+
+    async def async_start(self, host, port):
+        """Start polling and serving."""
+        # spread the first polls over one scan interval
+        step = self._scan_interval / max(len(self._devices), 1)
+        self._tasks = [
+            asyncio.create_task(self._async_poll(polled, index * step))
+            for index, polled in enumerate(self._devices.values())
+        ]
+
+        app = web.Application()
+        app.add_routes([
+            web.get('/devices', self._handle_devices),
+            web.get('/devices/{host}', self._handle_device),
+            web.post('/devices/{host}/{command}', self._handle_command),
+        ])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        _LOGGER.info("Polling %s devices, serving on %s:%s", len(self._devices), host, port)
+
+async def async_main(args, config):
+    """Create the devices in the running loop, their locks bind to it, and serve forever."""
+    scan_interval = config.get('scan_interval', DEFAULT_SCAN_INTERVAL)
+    timeout = config.get('timeout', DEFAULT_TIMEOUT)
+    devices = [
+        PolledDevice(conf, timeout)
+        for conf in config['devices']
+        if device_shard(conf['mac'], args.shards) == args.shard
+    ]
+    poller = HysenHeatingPoller(
+        devices,
+        scan_interval,
+        config.get('stale_after', 3 * scan_interval),
+        ThreadPoolExecutor(max_workers = args.workers))
+
+    await poller.async_start(args.host, args.port)
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Hysen Heating fleet poller')
+    parser.add_argument('config', help = 'YAML file with the device list')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = DEFAULT_PORT)
+    parser.add_argument('--shard', type = int, default = 0)
+    parser.add_argument('--shards', type = int, default = 1)
+    parser.add_argument('--workers', type = int, default = DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level = logging.INFO)
+
+    with open(args.config) as config_file:
+        config = yaml.safe_load(config_file)
+
+    try:
+        asyncio.run(async_main(args, config))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
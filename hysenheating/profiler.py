@@ -0,0 +1,169 @@
+"""
+Runtime toggleable profiling of the Hysen Heating update and command paths.
+Times each phase per host and captures sampled cProfile data
+of the update path for a bounded window.
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+PHASE_EXECUTOR_WAIT = 'executor_wait'
+PHASE_DEVICE_IO     = 'device_io'
+PHASE_DECODE        = 'decode'
+PHASE_CONVERT       = 'convert'
+PHASE_STATE_WRITE   = 'state_write'
+
+PROFILE_TOP_FUNCTIONS = 40
+
+# Device methods doing the network I/O (HysenHeatingDevice, RemoteHysenHeatingDevice)
+IO_METHODS = ('send_packet', '_request')
+
+class HysenHeatingProfiler:
+    """Phase timings per host and sampled cProfile captures."""
+
+    def __init__(self):
+        self.enabled = False
+        self._phases = {}
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._local = threading.local()
+        self._instrumented = set()
+        self._profiles = []
+        self._capture_until = None
+        self._sample_every = 1
+        self._samples = 0
+
+    @property
+    def capturing(self):
+        """Return True while a cProfile capture window is open."""
+        return self._capture_until is not None and time.monotonic() < self._capture_until
+
+    def record(self, host, phase, duration):
+        """Record the duration of one phase."""
+        with self._lock:
+            stats = self._phases.setdefault(host, {}).setdefault(phase, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+    def reset(self):
+        """Forget all phase timings."""
+        with self._lock:
+            self._phases = {}
+
+    def start_capture(self, duration, sample_every):
+        """Open a cProfile capture window, profiling every Nth call."""
+        self._profiles = []
+        self._samples = 0
+        self._sample_every = sample_every
+        self._capture_until = time.monotonic() + duration
+
+    def stop_capture(self):
+        """Close the capture window and return the captured profiles."""
+        self._capture_until = None
+        profiles, self._profiles = self._profiles, []
+        return profiles
+
+    def _sample(self):
+        """Return a new profile if this call is sampled."""
+        if not self.capturing:
+            return None
+        self._samples += 1
+        if self._samples % self._sample_every:
+            return None
+        return cProfile.Profile()
+
+    def _enable(self, profile):
+        """Enable a sampled profile, one at a time as cProfile is process wide."""
+        if profile is None or not self._profile_lock.acquire(blocking = False):
+            return None
+        self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def _disable(self, profile):
+        if profile is not None:
+            profile.disable()
+            self._profile_lock.release()
+
+    def _instrument(self, device, host):
+        """Time the network I/O of a device."""
+        if id(device) in self._instrumented:
+            return
+        self._instrumented.add(id(device))
+        for method in IO_METHODS:
+            if method in dir(device):
+                break
+        else:
+            return
+        func = getattr(device, method)
+
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                self._local.io = getattr(self._local, 'io', 0.0) + duration
+                self.record(host, PHASE_DEVICE_IO, duration)
+
+        setattr(device, method, timed)
+
+    def async_add_executor_job(self, hass, host, device, target, *args):
+        """Schedule a device call in the executor, timing the queueing,
+           the device I/O and the remaining (decode) time."""
+        self._instrument(device, host)
+        profile = self._sample()
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            self.record(host, PHASE_EXECUTOR_WAIT, started - submitted)
+            self._local.io = 0.0
+            enabled = self._enable(profile)
+            try:
+                return target(*args)
+            finally:
+                self._disable(enabled)
+                self.record(host, PHASE_DECODE, time.perf_counter() - started - self._local.io)
+
+        return hass.async_add_executor_job(run)
+
+    def call(self, host, phase, func, *args):
+        """Run func timed as the given phase."""
+        profile = self._sample()
+        start = time.perf_counter()
+        enabled = self._enable(profile)
+        try:
+            return func(*args)
+        finally:
+            self._disable(enabled)
+            self.record(host, phase, time.perf_counter() - start)
+
+    def summary(self):
+        """Return the phase timings as text."""
+        lines = ['%-20s %-14s %8s %10s %10s %10s' % ('host', 'phase', 'count', 'mean ms', 'max ms', 'total s')]
+        with self._lock:
+            for host, phases in sorted(self._phases.items()):
+                for phase, (count, total, maximum) in sorted(phases.items()):
+                    lines.append('%-20s %-14s %8d %10.2f %10.2f %10.2f' % (
+                        host, phase, count, total / count * 1000, maximum * 1000, total))
+        return '\n'.join(lines)
+
+    def dump(self, profiles, path):
+        """Write captured profiles (pstats format) and a text report."""
+        with open(path + '.txt', 'w') as report:
+            report.write(self.summary() + '\n\n')
+            if not profiles:
+                report.write('No update sampled.\n')
+                return
+            stream = io.StringIO()
+            stats = pstats.Stats(*profiles, stream = stream)
+            stats.dump_stats(path + '.prof')
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+            report.write(stream.getvalue())
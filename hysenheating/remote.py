@@ -0,0 +1,152 @@
+"""
+Remote access to Hysen Heating Thermostat Controllers
+served by the standalone fleet poller (see poller.py).
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+from hysen import HysenHeatingDevice
+
+# Device attributes decoded by HysenHeatingDevice.get_device_status
+HYSENHEAT_STATUS_FIELDS = (
+    'unique_id',
+    'fwversion',
+    'key_lock',
+    'manual_in_auto',
+    'valve_state',
+    'power_state',
+    'room_temp',
+    'target_temp',
+    'operation_mode',
+    'schedule',
+    'sensor',
+    'external_max_temp',
+    'hysteresis',
+    'max_temp',
+    'min_temp',
+    'calibration',
+    'frost_protection',
+    'poweron',
+    'unknown1',
+    'external_temp',
+    'clock_hour',
+    'clock_minute',
+    'clock_second',
+    'clock_weekday',
+    'period1_hour',
+    'period1_min',
+    'period2_hour',
+    'period2_min',
+    'period3_hour',
+    'period3_min',
+    'period4_hour',
+    'period4_min',
+    'period5_hour',
+    'period5_min',
+    'period6_hour',
+    'period6_min',
+    'we_period1_hour',
+    'we_period1_min',
+    'we_period2_hour',
+    'we_period2_min',
+    'period1_temp',
+    'period2_temp',
+    'period3_temp',
+    'period4_temp',
+    'period5_temp',
+    'period6_temp',
+    'we_period1_temp',
+    'we_period2_temp',
+    'unknown2',
+    'unknown3',
+)
+
+# HysenHeatingDevice commands which may be forwarded to the poller
+HYSENHEAT_COMMANDS = (
+    'set_target_temp',
+    'set_external_max_temp',
+    'set_operation_mode',
+    'set_power',
+    'set_key_lock',
+    'set_hysteresis',
+    'set_calibration',
+    'set_max_temp',
+    'set_min_temp',
+    'set_sensor',
+    'set_frost_protection',
+    'set_poweron',
+    'set_time',
+    'set_weekly_schedule',
+    'set_period1',
+    'set_period2',
+    'set_period3',
+    'set_period4',
+    'set_period5',
+    'set_period6',
+    'set_we_period1',
+    'set_we_period2',
+)
+
+def device_snapshot(device):
+    """Return the last decoded status of a device as a plain dict."""
+    return {field: getattr(device, field) for field in HYSENHEAT_STATUS_FIELDS}
+
+def read_device_snapshot(device):
+    """Poll a device and return its status, taken as a whole after decoding."""
+    device.get_device_status()
+    return device_snapshot(device)
+
+class RemoteHysenHeatingDevice:
+    """Stand-in for HysenHeatingDevice backed by a fleet poller.
+       Status reads are served from the poller's cache, commands are
+       forwarded to the poller which owns the device."""
+
+    def __init__(self, poller_url, host, mac, timeout):
+        self._url = poller_url.rstrip('/') + '/devices/' + host
+        self._host = host
+        self.timeout = timeout
+        self.snapshot_age = None
+        # start from the same status defaults as a directly polled device
+        for field, value in device_snapshot(HysenHeatingDevice((host, 80), mac, timeout, False, 0)).items():
+            setattr(self, field, value)
+
+    def get_device_status(self):
+        self._apply(self._request(self._url))
+
+    def _command(self, command, *args):
+        self._apply(self._request(self._url + '/' + command, {'args': list(args)}))
+
+    def _apply(self, response):
+        for field, value in response['status'].items():
+            setattr(self, field, value)
+        self.snapshot_age = response['age']
+
+    def _request(self, url, payload = None):
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(
+            url,
+            data = data,
+            headers = {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout = self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            raise ValueError(
+                'Poller error for %s: %s %s' % ( \
+                self._host,
+                exc.code,
+                exc.read().decode(errors = 'replace'))) from exc
+
+def _forward(command):
+    """Return a method forwarding a command to the poller."""
+    def forward(self, *args):
+        self._command(command, *args)
+    forward.__name__ = command
+    forward.__qualname__ = RemoteHysenHeatingDevice.__name__ + '.' + command
+    return forward
+
+# bound methods like HysenHeatingDevice's, named after the command
+for _command in HYSENHEAT_COMMANDS:
+    setattr(RemoteHysenHeatingDevice, _command, _forward(_command))
@@ -0,0 +1,93 @@
+"""
+Retry policy for Hysen Heating Thermostat Controller requests.
+Per-attempt timeouts adapt to the observed device latency,
+all attempts share one overall deadline.
+"""
+
+import asyncio
+import time
+
+RETRY_MIN_TIMEOUT     = 0.3
+RETRY_INITIAL_TIMEOUT = 1.0
+RETRY_BACKOFF         = 2
+
+# Commands which are safe to send again after a lost response
+IDEMPOTENT_COMMANDS = frozenset([
+    'get_device_status',
+    'read_device_snapshot',
+])
+
+class HysenHeatingRetryPolicy:
+    """Retransmits idempotent requests with short timeouts.
+       The per-attempt timeout follows the smoothed round trip time
+       of the device (srtt + 4 * rttvar, as in RFC 6298)."""
+
+    def __init__(self, deadline, min_timeout = RETRY_MIN_TIMEOUT, initial_timeout = RETRY_INITIAL_TIMEOUT):
+        self.deadline = deadline
+        self._min_timeout = min_timeout
+        self._initial_timeout = initial_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.retries = 0
+        # the attempt timeout is set on the device, so its calls must not interleave;
+        # waited for in the event loop, not in an executor thread
+        self._lock = None
+
+    @property
+    def attempt_timeout(self):
+        """Timeout of a first attempt."""
+        if self.srtt is None:
+            timeout = self._initial_timeout
+        else:
+            timeout = self.srtt + 4 * self.rttvar
+        return min(max(timeout, self._min_timeout), self.deadline)
+
+    def observe(self, rtt):
+        """Record the duration of a successful request."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    async def async_call(self, async_add_executor_job, device, func, *args):
+        """Run a device call in the executor and return its result.
+           Idempotent calls are retried with growing per-attempt timeouts
+           until the deadline, other calls get one attempt with the whole deadline.
+           Each attempt opens its own socket, so retries are sequential and
+           a late reply to an abandoned attempt is lost. Calls of the device
+           (polls, commands) are serialized in the event loop."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await self._async_call(async_add_executor_job, device, func, *args)
+
+    async def _async_call(self, async_add_executor_job, device, func, *args):
+        if func.__name__ not in IDEMPOTENT_COMMANDS:
+            _, result = await async_add_executor_job(self._call, device, self.deadline, func, *args)
+            return result
+
+        end = time.monotonic() + self.deadline
+        timeout = self.attempt_timeout
+        while True:
+            try:
+                elapsed, result = await async_add_executor_job(self._call, device, timeout, func, *args)
+            except Exception:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    raise
+                self.retries += 1
+                timeout = min(timeout * RETRY_BACKOFF, remaining)
+                continue
+            self.observe(elapsed)
+            return result
+
+    def _call(self, device, timeout, func, *args):
+        device.timeout = timeout
+        start = time.monotonic()
+        try:
+            result = func(*args)
+        finally:
+            device.timeout = self.deadline
+        return time.monotonic() - start, result
@@ -0,0 +1,44 @@
+"""
+Heating runtime and energy accumulator for Hysen Heating Thermostat Controllers.
+Counters are advanced on every status poll, so statistics never need history scans.
+"""
+
+# Gaps between polls longer than this are not accounted (e.g. device unreachable)
+RUNTIME_MAX_GAP = 900
+
+class HysenHeatingRuntime:
+    """Accumulates valve open time and estimated energy of one device."""
+
+    def __init__(self, heater_power = None):
+        self.heater_power = heater_power
+        self.runtime = 0.0
+        self.energy = 0.0
+        self._valve_open = None
+        self._last_time = None
+
+    def update(self, valve_open, now):
+        """Account the time since the last poll using the previous valve state.
+           Returns True if the counters changed."""
+        changed = False
+        if self._valve_open and self._last_time is not None:
+            elapsed = now - self._last_time
+            if 0 < elapsed <= RUNTIME_MAX_GAP:
+                self.runtime += elapsed
+                if self.heater_power is not None:
+                    self.energy += self.heater_power * elapsed / 3600000
+                changed = True
+        self._valve_open = valve_open
+        self._last_time = now
+        return changed
+
+    def as_dict(self):
+        """Return the counters to be persisted."""
+        return {
+            'runtime': self.runtime,
+            'energy': self.energy,
+        }
+
+    def restore(self, data):
+        """Restore persisted counters."""
+        self.runtime = float(data.get('runtime', 0.0))
+        self.energy = float(data.get('energy', 0.0))
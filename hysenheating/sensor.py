@@ -0,0 +1,109 @@
+"""
+Heating runtime and energy sensors for Hysen Heating Thermostat Controller.
+Hysen HY03-1-Wifi device and derivative
+"""
+
+from homeassistant.components.sensor import (
+    STATE_CLASS_TOTAL_INCREASING,
+    SensorEntity
+)
+
+from homeassistant.const import (
+    DEVICE_CLASS_ENERGY,
+    ENERGY_KILO_WATT_HOUR,
+    TIME_HOURS,
+)
+
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .climate import DATA_KEY, SIGNAL_UPDATE
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info = None):
+    """Set up the Hysen heating runtime sensors."""
+    if discovery_info is None:
+        return
+
+    entities = []
+    for host in discovery_info['hosts']:
+        thermostat = hass.data[DATA_KEY][host]
+        entities.append(HysenHeatingRuntimeSensor(thermostat))
+        if thermostat.runtime.heater_power is not None:
+            entities.append(HysenHeatingEnergySensor(thermostat))
+
+    async_add_entities(entities)
+
+class HysenHeatingRuntimeSensorBase(SensorEntity):
+    """Base for sensors reading a thermostat's runtime accumulator."""
+
+    def __init__(self, thermostat):
+        """Initialize the sensor."""
+        self._thermostat = thermostat
+
+    async def async_added_to_hass(self):
+        """Follow the thermostat polls."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_UPDATE.format(self._thermostat.host),
+                self.async_write_ha_state))
+
+    @property
+    def should_poll(self):
+        """The thermostat pushes its updates."""
+        return False
+
+    @property
+    def state_class(self):
+        """Return the state class."""
+        return STATE_CLASS_TOTAL_INCREASING
+
+class HysenHeatingRuntimeSensor(HysenHeatingRuntimeSensorBase):
+    """Total time the thermostat valve has been open."""
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._thermostat.unique_id + '_runtime'
+
+    @property
+    def name(self):
+        """Returns the name of the sensor."""
+        return self._thermostat.name + ' heating runtime'
+
+    @property
+    def native_unit_of_measurement(self):
+        """Returns the unit of measurement."""
+        return TIME_HOURS
+
+    @property
+    def native_value(self):
+        """Returns the runtime in hours."""
+        return round(self._thermostat.runtime.runtime / 3600, 3)
+
+class HysenHeatingEnergySensor(HysenHeatingRuntimeSensorBase):
+    """Energy estimated from the runtime and the configured heater power."""
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._thermostat.unique_id + '_energy'
+
+    @property
+    def name(self):
+        """Returns the name of the sensor."""
+        return self._thermostat.name + ' heating energy'
+
+    @property
+    def device_class(self):
+        """Return the device class."""
+        return DEVICE_CLASS_ENERGY
+
+    @property
+    def native_unit_of_measurement(self):
+        """Returns the unit of measurement."""
+        return ENERGY_KILO_WATT_HOUR
+
+    @property
+    def native_value(self):
+        """Returns the energy in kWh."""
+        return round(self._thermostat.runtime.energy, 3)
@@ -0,0 +1,198 @@
+"""
+Shared UDP endpoint for Hysen Heating Thermostat Controllers.
+All devices send their requests through one event loop socket,
+responses are matched back by device address and packet counter.
+"""
+
+import asyncio
+import socket
+import time
+
+from broadlink import exceptions as e
+
+from hysen import HysenHeatingDevice
+
+from .profiler import PHASE_DECODE, PHASE_DEVICE_IO
+from .retry import IDEMPOTENT_COMMANDS
+
+class HysenHeatingTransport(asyncio.DatagramProtocol):
+    """One UDP socket multiplexing the requests of the whole fleet."""
+
+    def __init__(self):
+        self._transport = None
+        self._pending = {}
+
+    @classmethod
+    async def async_open(cls):
+        """Bind the shared socket."""
+        loop = asyncio.get_running_loop()
+        _, protocol = await loop.create_datagram_endpoint(cls, local_addr = ('0.0.0.0', 0))
+        return protocol
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 0x30:
+            return
+        count = int.from_bytes(data[0x28:0x2A], 'little')
+        future = self._pending.get((addr[0], count))
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def close(self):
+        """Close the shared socket."""
+        if self._transport is not None:
+            self._transport.close()
+
+    async def async_request(self, host, packet, count, timeout, retransmit):
+        """Send a packet and wait for the response carrying the same counter.
+           The packet is sent again every retransmit seconds until timeout,
+           the first response wins. Returns the response and whether
+           it answered the first transmission only."""
+        key = (host[0], count)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        end = time.monotonic() + timeout
+        transmissions = 0
+        try:
+            while True:
+                self._transport.sendto(packet, host)
+                transmissions += 1
+                remaining = end - time.monotonic()
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), min(retransmit, remaining))
+                    return response, transmissions == 1
+                except asyncio.TimeoutError:
+                    if time.monotonic() >= end:
+                        raise e.NetworkTimeoutError(
+                            -4000,
+                            "Network timeout",
+                            "No response received within %ss" % timeout,
+                        )
+        finally:
+            self._pending.pop(key, None)
+
+async def async_resolve(host):
+    """Return the IPv4 address of a host, as responses are matched on it."""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, None, family = socket.AF_INET, type = socket.SOCK_DGRAM)
+    return infos[0][4][0]
+
+class _PacketRequired(Exception):
+    """Raised by a replayed call which needs a response not received yet."""
+
+    def __init__(self, packet, count):
+        super().__init__()
+        self.packet = packet
+        self.count = count
+
+class SharedSocketHysenHeatingDevice(HysenHeatingDevice):
+    """HysenHeatingDevice talking through the shared transport.
+       The synchronous protocol code of hysen is run in the event loop by replay:
+       when a call needs a response it has not received yet, the call is aborted,
+       the packet is sent through the transport, and the call is run again from
+       the saved device state with the responses received so far."""
+
+    def __init__(self, host, mac, timeout, sync_clock, sync_hour, transport):
+        HysenHeatingDevice.__init__(self, host, mac, timeout, sync_clock, sync_hour)
+        self._transport = transport
+        self._responses = None
+        self._replayed = 0
+        # calls restore the device state on replay, so they must not interleave
+        self._call_lock = None
+
+    def send_packet(self, packet_type, payload):
+        """Return the recorded response or request the packet to be sent."""
+        # advanced for replayed packets too, so each packet of a call keeps its own counter
+        self.count = ((self.count + 1) | 0x8000) & 0xFFFF
+        if self._replayed < len(self._responses):
+            self._replayed += 1
+            return self._responses[self._replayed - 1]
+
+        packet = bytearray(0x38)
+        packet[0x00:0x08] = bytes.fromhex("5aa5aa555aa5aa55")
+        packet[0x24:0x26] = self.devtype.to_bytes(2, "little")
+        packet[0x26:0x28] = packet_type.to_bytes(2, "little")
+        packet[0x28:0x2A] = self.count.to_bytes(2, "little")
+        packet[0x2A:0x30] = self.mac[::-1]
+        packet[0x30:0x34] = self.id.to_bytes(4, "little")
+
+        p_checksum = sum(payload, 0xBEAF) & 0xFFFF
+        packet[0x34:0x36] = p_checksum.to_bytes(2, "little")
+
+        padding = (16 - len(payload)) % 16
+        payload = self.encrypt(payload + bytes(padding))
+        packet.extend(payload)
+
+        checksum = sum(packet, 0xBEAF) & 0xFFFF
+        packet[0x20:0x22] = checksum.to_bytes(2, "little")
+
+        raise _PacketRequired(bytes(packet), self.count)
+
+    @staticmethod
+    def _check_response(response):
+        if len(response) < 0x30:
+            raise e.DataValidationError(
+                -4007,
+                "Received data packet length error",
+                "Expected at least 48 bytes and received %s" % len(response),
+            )
+        nom_checksum = int.from_bytes(response[0x20:0x22], "little")
+        real_checksum = sum(response, 0xBEAF) - sum(response[0x20:0x22]) & 0xFFFF
+        if nom_checksum != real_checksum:
+            raise e.DataValidationError(
+                -4008,
+                "Received data packet check error",
+                "Expected a checksum of %s and received %s" % (nom_checksum, real_checksum),
+            )
+
+    async def async_call(self, retry_policy, func, *args, record = None):
+        """Run a device call in the event loop and return its result.
+           Packets of idempotent calls are retransmitted after the retry policy's
+           attempt timeout within its deadline, commands are sent once like on
+           the executor path; round trips answered at the first transmission
+           update the policy's latency estimate.
+           record(phase, duration), when given, receives the time spent waiting
+           for the device and running (decoding) the call."""
+        if self._call_lock is None:
+            self._call_lock = asyncio.Lock()
+        async with self._call_lock:
+            return await self._async_replay(retry_policy, func, record, *args)
+
+    async def _async_replay(self, retry_policy, func, record, *args):
+        state = dict(self.__dict__)
+        responses = []
+        end = time.monotonic() + retry_policy.deadline
+        if func.__name__ in IDEMPOTENT_COMMANDS:
+            retransmit = retry_policy.attempt_timeout
+        else:
+            retransmit = retry_policy.deadline
+        started = time.perf_counter()
+        io = 0.0
+        try:
+            while True:
+                self.__dict__.update(state)
+                self._responses = responses
+                self._replayed = 0
+                try:
+                    return func(*args)
+                except _PacketRequired as request:
+                    start = time.monotonic()
+                    response, first = await self._transport.async_request(
+                        self.host,
+                        request.packet,
+                        request.count,
+                        max(end - start, 0),
+                        retransmit)
+                    io += time.monotonic() - start
+                    if first:
+                        retry_policy.observe(time.monotonic() - start)
+                    else:
+                        retry_policy.retries += 1
+                    self._check_response(response)
+                    responses.append(response)
+        finally:
+            if record is not None:
+                record(PHASE_DEVICE_IO, io)
+                record(PHASE_DECODE, time.perf_counter() - started - io)
@@ -0,0 +1,363 @@
+"""
+Service call storm load test for the Hysen Heating integration.
+
+Runs the integration inside a minimal Home Assistant instance against
+in-process stub devices with simulated network latency and packet loss,
+fires concurrent storms of entity service calls alongside regular polling
+and reports latency percentiles, error rates, executor queueing and
+lost or reordered commands.
+
+Usage:
+    python scripts/loadtest.py --devices 200 --calls 5000 --concurrency 100 \\
+        --slo-p99 2000 --slo-error-rate 0.01
+
+Exits with status 1 when an SLO is not met.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import importlib
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from homeassistant import config_entries, core, runner
+from homeassistant.config import async_process_ha_core_config
+from homeassistant.helpers import area_registry, device_registry, entity_registry
+from homeassistant.helpers.entity_component import async_update_entity
+from homeassistant.setup import async_setup_component
+
+from hysen import (
+    HYSENHEAT_KEY_LOCK_OFF,
+    HYSENHEAT_MANUAL_IN_AUTO_OFF,
+    HYSENHEAT_MODE_MANUAL,
+    HYSENHEAT_POWER_ON,
+    HYSENHEAT_POWERON_OFF,
+    HYSENHEAT_FROST_PROTECTION_OFF,
+    HYSENHEAT_SCHEDULE_1234567,
+    HYSENHEAT_SENSOR_INTERNAL,
+    HYSENHEAT_VALVE_OFF,
+)
+
+INTEGRATION = 'hysenheating'
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMP_MIN = 5
+TEMP_MAX = 35
+
+# Errors logged on behalf of the service call running in the current context
+CALL_ERRORS = contextvars.ContextVar('call_errors', default = None)
+
+class StubHysenHeatingDevice:
+    """In-process HysenHeatingDevice with simulated latency and loss.
+       Applied commands are recorded to detect lost and reordered calls."""
+
+    latency = 0.05
+    jitter = 0.02
+    loss = 0.0
+
+    def __init__(self, host, mac, timeout, sync_clock, sync_hour):
+        self.unique_id = ''.join(format(x, '02x') for x in bytearray(mac))
+        self.timeout = timeout
+        self.applied = []
+        self._lock = threading.Lock()
+
+        self.fwversion = 0
+        self.key_lock = HYSENHEAT_KEY_LOCK_OFF
+        self.manual_in_auto = HYSENHEAT_MANUAL_IN_AUTO_OFF
+        self.valve_state = HYSENHEAT_VALVE_OFF
+        self.power_state = HYSENHEAT_POWER_ON
+        self.room_temp = 20.0
+        self.target_temp = 22.0
+        self.operation_mode = HYSENHEAT_MODE_MANUAL
+        self.schedule = HYSENHEAT_SCHEDULE_1234567
+        self.sensor = HYSENHEAT_SENSOR_INTERNAL
+        self.external_max_temp = 42
+        self.hysteresis = 2
+        self.max_temp = TEMP_MAX
+        self.min_temp = TEMP_MIN
+        self.calibration = 0.0
+        self.frost_protection = HYSENHEAT_FROST_PROTECTION_OFF
+        self.poweron = HYSENHEAT_POWERON_OFF
+        self.unknown1 = 0
+        self.external_temp = 0.0
+        self.clock_hour = 0
+        self.clock_minute = 0
+        self.clock_second = 0
+        self.clock_weekday = 1
+        for period in ('period1', 'period2', 'period3', 'period4', 'period5', 'period6', 'we_period1', 'we_period2'):
+            setattr(self, period + '_hour', 0)
+            setattr(self, period + '_min', 0)
+            setattr(self, period + '_temp', 20.0)
+        self.unknown2 = 0
+        self.unknown3 = 0
+
+    def _exchange(self):
+        """Simulate one request/response round trip."""
+        if random.random() < self.loss:
+            time.sleep(self.timeout)
+            raise OSError('Network timeout')
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def _apply(self, command, value):
+        self._exchange()
+        with self._lock:
+            self.applied.append((command, value))
+
+    def get_device_status(self):
+        self._exchange()
+
+    def set_target_temp(self, temp):
+        self.get_device_status()
+        self._apply('set_temperature', temp)
+        self.target_temp = temp
+
+    def set_period1(self, hour, minute, temp):
+        self.get_device_status()
+        self._apply('set_schedule', temp)
+        if temp is not None:
+            self.period1_temp = temp
+
+    def __getattr__(self, name):
+        if name.startswith('set_'):
+            return lambda *args: self._apply(name, args)
+        raise AttributeError(name)
+
+class LoadTestStats:
+    """Latency, executor and error samples collected during a run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.executor_waits = []
+        self.calls = 0
+        self.failed_calls = 0
+        self.poll_errors = 0
+
+class ErrorCounter(logging.Handler):
+    """Counts errors logged by the integration, against the service call
+       they were logged for (the context is inherited by the service tasks)
+       or else as poll errors."""
+
+    def __init__(self, stats):
+        super().__init__(logging.ERROR)
+        self._stats = stats
+
+    def emit(self, record):
+        call_errors = CALL_ERRORS.get()
+        if call_errors is None:
+            self._stats.poll_errors += 1
+        else:
+            call_errors.append(record)
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def instrument_executor(hass, stats):
+    """Record the queueing delay of every executor job."""
+    async_add_executor_job = hass.async_add_executor_job
+
+    def timed_add_executor_job(target, *args):
+        submitted = time.monotonic()
+
+        def run():
+            stats.executor_waits.append(time.monotonic() - submitted)
+            return target(*args)
+
+        return async_add_executor_job(run)
+
+    hass.async_add_executor_job = timed_add_executor_job
+
+def check_commands(issued, applied):
+    """Match applied commands to issued ones.
+       Returns the number of lost and reordered commands."""
+    lost = 0
+    reordered = 0
+    for entity_id, calls in issued.items():
+        pending = {}
+        for index, call in enumerate(calls):
+            pending.setdefault(call, []).append(index)
+        last_index = -1
+        for call in applied[entity_id]:
+            if not pending.get(call):
+                continue
+            index = pending[call].pop(0)
+            if index < last_index:
+                reordered += 1
+            last_index = max(last_index, index)
+        lost += sum(len(indexes) for indexes in pending.values())
+    return lost, reordered
+
+async def async_poll(hass, entity_ids, interval, stop):
+    """Regular polling running alongside the storm."""
+    while not stop.is_set():
+        await asyncio.gather(*[async_update_entity(hass, entity_id) for entity_id in entity_ids])
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def async_storm(hass, args, entity_ids, stats):
+    """Fire the configured number of service calls, bounded by the concurrency."""
+    issued = {entity_id: [] for entity_id in entity_ids}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def call(index):
+        entity_id = random.choice(entity_ids)
+        temp = TEMP_MIN + index % (TEMP_MAX - TEMP_MIN + 1)
+        if random.random() < args.schedule_ratio:
+            service, data, record = 'set_schedule', {'period1_temp': float(temp)}, ('set_schedule', float(temp))
+        else:
+            service, data, record = 'set_temperature', {'temperature': temp}, ('set_temperature', float(temp))
+        async with semaphore:
+            issued[entity_id].append(record)
+            call_errors = []
+            CALL_ERRORS.set(call_errors)
+            start = time.monotonic()
+            # no limit: a blocking call otherwise returns after 10 s while still running
+            await hass.services.async_call(
+                INTEGRATION, service, dict(data, entity_id = entity_id), blocking = True, limit = None)
+            stats.latencies.append(time.monotonic() - start)
+            stats.calls += 1
+            if call_errors:
+                stats.failed_calls += 1
+
+    await asyncio.gather(*[call(index) for index in range(args.calls)])
+    return issued
+
+async def async_run(args, config_dir):
+    sys.path.insert(0, config_dir)
+    climate = importlib.import_module('custom_components.%s.climate' % INTEGRATION)
+    climate.HysenHeatingDevice = StubHysenHeatingDevice
+    StubHysenHeatingDevice.latency = args.latency / 1000
+    StubHysenHeatingDevice.jitter = args.jitter / 1000
+    StubHysenHeatingDevice.loss = args.loss
+
+    stats = LoadTestStats()
+    logging.getLogger('custom_components.%s' % INTEGRATION).addHandler(ErrorCounter(stats))
+
+    # the executor Home Assistant's runner installs, not asyncio's (cpu count + 4)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(thread_name_prefix = 'SyncWorker', max_workers = runner.MAX_EXECUTOR_WORKERS))
+    hass = core.HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await async_process_ha_core_config(hass, {})
+    await asyncio.gather(
+        area_registry.async_load(hass),
+        device_registry.async_load(hass),
+        entity_registry.async_load(hass))
+    hass.state = core.CoreState.running
+    instrument_executor(hass, stats)
+
+    device_configs = [
+        {
+            'name': 'Load %s' % index,
+            'host': '10.%s.%s.%s' % (index >> 16 & 0xFF, index >> 8 & 0xFF, index & 0xFF),
+            'mac': ':'.join(format(x, '02x') for x in (0x78, 0x0f, 0x77, index >> 16 & 0xFF, index >> 8 & 0xFF, index & 0xFF)),
+            'timeout': args.timeout,
+        }
+        for index in range(args.devices)
+    ]
+    await async_setup_component(hass, 'climate', {'climate': [{'platform': INTEGRATION, 'devices': device_configs}]})
+    await hass.async_block_till_done()
+
+    devices = hass.data[climate.DATA_KEY]
+    entity_ids = [device.entity_id for device in devices.values()]
+    stats.executor_waits.clear()
+    stats.poll_errors = 0
+
+    stop = asyncio.Event()
+    poller = asyncio.create_task(async_poll(hass, entity_ids, args.poll_interval, stop))
+    start = time.monotonic()
+    issued = await async_storm(hass, args, entity_ids, stats)
+    duration = time.monotonic() - start
+    stop.set()
+    await poller
+
+    applied = {
+        device.entity_id: [
+            (command, float(value))
+            for command, value in device._hysen_device.applied
+            if command in ('set_temperature', 'set_schedule')
+        ]
+        for device in devices.values()
+    }
+    lost, reordered = check_commands(issued, applied)
+
+    await hass.async_stop(force = True)
+
+    error_rate = stats.failed_calls / max(stats.calls, 1)
+    report = [
+        ('devices', args.devices),
+        ('calls', stats.calls),
+        ('duration s', round(duration, 2)),
+        ('throughput calls/s', round(stats.calls / duration, 1)),
+        ('latency p50 ms', round(percentile(stats.latencies, 50) * 1000, 1)),
+        ('latency p95 ms', round(percentile(stats.latencies, 95) * 1000, 1)),
+        ('latency p99 ms', round(percentile(stats.latencies, 99) * 1000, 1)),
+        ('latency max ms', round(max(stats.latencies, default = 0) * 1000, 1)),
+        ('executor wait p50 ms', round(percentile(stats.executor_waits, 50) * 1000, 1)),
+        ('executor wait p99 ms', round(percentile(stats.executor_waits, 99) * 1000, 1)),
+        ('failed calls', stats.failed_calls),
+        ('error rate', round(error_rate, 4)),
+        ('poll errors', stats.poll_errors),
+        ('lost commands', lost),
+        ('reordered commands', reordered),
+    ]
+    for name, value in report:
+        print('%-22s %s' % (name, value))
+
+    failed = False
+    if args.slo_p99 is not None and percentile(stats.latencies, 99) * 1000 > args.slo_p99:
+        print('SLO failed: latency p99 above %s ms' % args.slo_p99)
+        failed = True
+    if args.slo_error_rate is not None and error_rate > args.slo_error_rate:
+        print('SLO failed: error rate above %s' % args.slo_error_rate)
+        failed = True
+    if args.slo_lost is not None and lost > args.slo_lost:
+        print('SLO failed: more than %s lost commands' % args.slo_lost)
+        failed = True
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Hysen Heating service call storm load test')
+    parser.add_argument('--devices', type = int, default = 100)
+    parser.add_argument('--calls', type = int, default = 2000)
+    parser.add_argument('--concurrency', type = int, default = 100)
+    parser.add_argument('--schedule-ratio', type = float, default = 0.1,
+                        help = 'share of set_schedule calls, the rest are set_temperature')
+    parser.add_argument('--poll-interval', type = float, default = 5.0, help = 'seconds')
+    parser.add_argument('--latency', type = float, default = 50.0, help = 'stub device latency in ms')
+    parser.add_argument('--jitter', type = float, default = 20.0, help = 'stub device jitter in ms')
+    parser.add_argument('--loss', type = float, default = 0.0, help = 'stub packet loss probability')
+    parser.add_argument('--timeout', type = int, default = 2, help = 'device timeout in s')
+    parser.add_argument('--slo-p99', type = float, help = 'maximum latency p99 in ms')
+    parser.add_argument('--slo-error-rate', type = float, help = 'maximum share of failed service calls')
+    parser.add_argument('--slo-lost', type = int, help = 'maximum number of lost commands')
+    args = parser.parse_args()
+
+    config_dir = tempfile.mkdtemp(prefix = 'hysenheating-loadtest-')
+    try:
+        os.makedirs(os.path.join(config_dir, 'custom_components'))
+        os.symlink(
+            os.path.join(REPO_DIR, INTEGRATION),
+            os.path.join(config_dir, 'custom_components', INTEGRATION))
+        failed = asyncio.run(async_run(args, config_dir))
+    finally:
+        shutil.rmtree(config_dir)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Tests of the shared UDP transport."""
+
+import asyncio
+
+from hysenheating.retry import HysenHeatingRetryPolicy
+from hysenheating.transport import SharedSocketHysenHeatingDevice, async_resolve
+
+MAC = bytes.fromhex('780f77ea722d')
+
+class StubTransport:
+    """Answers every request at once, recording the packet counters."""
+
+    def __init__(self):
+        self.counts = []
+        self.retransmits = []
+
+    async def async_request(self, host, packet, count, timeout, retransmit):
+        assert int.from_bytes(packet[0x28:0x2A], 'little') == count
+        self.counts.append(count)
+        self.retransmits.append(retransmit)
+        response = bytearray(0x38)
+        response[0x28:0x2A] = count.to_bytes(2, 'little')
+        checksum = sum(response, 0xBEAF) & 0xFFFF
+        response[0x20:0x22] = checksum.to_bytes(2, 'little')
+        return bytes(response), True
+
+def test_replay_keeps_packet_counters_distinct():
+    transport = StubTransport()
+    device = SharedSocketHysenHeatingDevice(('192.168.100.150', 80), MAC, 5, False, 4, transport)
+
+    def call():
+        return [device.send_packet(0x6A, bytes(16)) for _ in range(3)]
+
+    responses = asyncio.run(device.async_call(HysenHeatingRetryPolicy(5), call))
+
+    assert len(set(transport.counts)) == 3
+    assert [int.from_bytes(response[0x28:0x2A], 'little') for response in responses] == transport.counts
+    assert device.count == transport.counts[-1]
+
+def test_next_call_continues_the_counter():
+    transport = StubTransport()
+    device = SharedSocketHysenHeatingDevice(('192.168.100.150', 80), MAC, 5, False, 4, transport)
+    policy = HysenHeatingRetryPolicy(5)
+
+    for _ in range(2):
+        asyncio.run(device.async_call(policy, lambda: [device.send_packet(0x6A, bytes(16)) for _ in range(2)]))
+
+    assert len(set(transport.counts)) == 4
+
+def test_resolve_hostname_to_address():
+    assert asyncio.run(async_resolve('localhost')) == '127.0.0.1'
+    assert asyncio.run(async_resolve('192.168.100.150')) == '192.168.100.150'
+
+def test_commands_are_not_retransmitted():
+    transport = StubTransport()
+    device = SharedSocketHysenHeatingDevice(('192.168.100.150', 80), MAC, 5, False, 4, transport)
+    policy = HysenHeatingRetryPolicy(5)
+
+    def set_power():
+        return device.send_packet(0x6A, bytes(16))
+
+    def read_device_snapshot():
+        return device.send_packet(0x6A, bytes(16))
+
+    asyncio.run(device.async_call(policy, set_power))
+    asyncio.run(device.async_call(policy, read_device_snapshot))
+
+    assert transport.retransmits == [5, policy.attempt_timeout]
+
+def test_replay_phases_are_recorded():
+    transport = StubTransport()
+    device = SharedSocketHysenHeatingDevice(('192.168.100.150', 80), MAC, 5, False, 4, transport)
+    phases = []
+
+    asyncio.run(device.async_call(
+        HysenHeatingRetryPolicy(5),
+        lambda: [device.send_packet(0x6A, bytes(16)) for _ in range(2)],
+        record = lambda phase, duration: phases.append(phase)))
+
+    assert phases == ['device_io', 'decode']